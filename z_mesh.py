@@ -1,19 +1,40 @@
+import collections
+import heapq
 import os
+import queue
 import threading
 import time
-import base64
+import struct
+import zlib
+from collections.abc import Iterable
 from pathlib import Path
 from textual.app import App, ComposeResult
 from textual.widgets import Header, Footer, Button, DataTable, Log, Label, DirectoryTree, ProgressBar
 from textual.containers import Horizontal, Vertical
 from textual import work
+import zstandard
 import meshtastic
 import meshtastic.serial_interface
+from meshtastic.protobuf import portnums_pb2
 from pubsub import pub 
 
+# Binary packets on a private port: 1-byte opcode + 2-byte chunk number,
+# followed for OP_DATA by the chunk bytes and a CRC32 over header and chunk
+Z_MESH_PORTNUM = portnums_pb2.PRIVATE_APP
+_PACKET_HEADER = struct.Struct(">BH")
+_CRC_TRAILER = struct.Struct(">I")
+OP_DATA = 1
+OP_GOCONT = 2
+OP_NAK = 3  # Chunk arrived corrupted; resend it
+OP_FAIL = 4  # Reassembled file failed verification and was discarded
+
 class NoHiddenFilter(DirectoryTree):
-    def filter_paths(self, paths: list[Path]) -> list[Path]:
-        return [path for path in paths if not path.name.startswith(".")]
+    # Bulky dependency folders nobody sends over LoRa
+    SKIP_NAMES = frozenset({"node_modules", "venv", "__pycache__"})
+
+    def filter_paths(self, paths: Iterable[Path]) -> Iterable[Path]:
+        return (path for path in paths
+                if not path.name.startswith(".") and path.name not in self.SKIP_NAMES)
 
 class MeshZApp(App):
     TITLE = "Z-Mesh: Meshtastic File Transfer"
@@ -21,21 +42,42 @@ class MeshZApp(App):
     # Transfer State Variables
     target_node_id = None  
     selected_file_path = None
+    _file_browser_loaded = False
     CHUNK_SIZE = 120  # Optimized for real-world reliability
-    current_chunk = 0
+    ZSTD_LEVEL = 9
+    MIN_COMPRESSION_GAIN = 0.95  # Only send compressed if it saves at least 5%
+    MAX_COMPRESSION_RATIO = 8  # Files bigger than the chunk limit times this are refused unread
+    MAX_CHUNKS = 0xFFFF  # Chunk numbers are a 2-byte header field
+    # Shared by the sender's pre-read check and the receiver's MESHZ_REQ validation
+    MAX_FILE_SIZE = MAX_CHUNKS * CHUNK_SIZE * MAX_COMPRESSION_RATIO
+    WINDOW_SIZE = 4  # Chunks allowed in flight before waiting on a GOCONT
+    next_to_send = 0
+    base = 0  # Lowest unacknowledged chunk
     total_chunks = 0
     transfer_active = False
+    transfer_start_time = 0
+    in_flight = {}  # chunk_num -> time.monotonic() send time; only touched while holding _timer_cv
+    _payloads = None  # Binary OP_DATA packets, built once per transfer
     
     # Retry/Watchdog Logic
-    last_ack_time = 0
-    retry_count = 0
+    retry_count = {}  # chunk_num -> retries so far
     MAX_RETRIES = 5
     TIMEOUT_SECONDS = 30 # Increased to prevent premature timeouts
 
     # Receiver State Variables
+    receiving_peer = None  # Node that sent the active MESHZ_REQ; data from anyone else is dropped
     receiving_file_name = None
     receiving_total_chunks = 0
-    receive_buffer = {} 
+    receiving_file_size = 0  # Original (uncompressed) size announced in MESHZ_REQ
+    receiving_file_crc = 0  # CRC32 of the original (uncompressed) file
+    receiving_compressed = False
+    receive_buffer = bytearray()  # Preallocated to the incoming on-air (possibly compressed) size
+    _receive_view = memoryview(receive_buffer)  # Chunks are copied straight into this
+    received_mask = bytearray()  # One byte per chunk, set once received
+    received_count = 0
+
+    # Latest (current, total, label, rate) waiting to be drawn by _flush_progress
+    _pending_progress = None
 
     BINDINGS = [("q", "quit", "Quit")]
 
@@ -56,7 +98,6 @@ class MeshZApp(App):
         yield Header()
         with Vertical(id="file-browser-container"):
             yield Label("📁 SELECT A FILE (Double-click to pick)")
-            yield NoHiddenFilter(str(Path.home()), id="file-browser")
         with Horizontal():
             with Vertical(id="sidebar"):
                 yield Label(
@@ -82,17 +123,50 @@ class MeshZApp(App):
         yield Footer()
 
     def on_mount(self) -> None:
-        table = self.query_one("#node-table", DataTable)
-        table.add_columns("Name", "Node ID", "SNR")
-        table.cursor_type = "row"
+        # Thread-shared plumbing is per instance, created before any thread below can touch it
+        # Chunk sends are handed to a sender thread so radio callbacks never block on serial writes
+        self._send_queue = queue.Queue()
+        self._radio_lock = threading.Lock()  # Serializes all writes to self.interface
+        # (deadline, chunk_num) min-heap; stale entries are skipped when popped
+        self._timer_heap = []
+        self._timer_cv = threading.Condition()  # Reentrant; also guards in_flight, retry_count and _payloads
+        # Log lines from any thread, written to the Log widget in batches by _drain_log
+        self._log_queue = collections.deque(maxlen=1000)
+
+        # Resolve widgets once; radio callbacks fire far too often for DOM walks
+        self._node_table = self.query_one("#node-table", DataTable)
+        self._bar = self.query_one("#transfer-bar", ProgressBar)
+        self._progress_txt = self.query_one("#progress-text", Label)
+        self._progress_container = self.query_one("#progress-container")
+        self._status_log = self.query_one("#status-log", Log)
+        self._file_label = self.query_one("#file-label", Label)
+        self._target_label = self.query_one("#target-label", Label)
+        self._file_browser_container = self.query_one("#file-browser-container")
+        self._node_table.add_columns("Name", "Node ID", "SNR")
+        self._node_table.cursor_type = "row"
+        self.set_interval(0.05, self._flush_progress)
+        self.set_interval(0.1, self._drain_log)
+        # One dict lookup decides whether a packet is ours and which handler gets it
+        self._port_handlers = {
+            'PRIVATE_APP': self.handle_binary_packet,
+            'TEXT_MESSAGE_APP': self.handle_control_message,
+        }
+        self._op_handlers = {
+            OP_DATA: self.handle_data_packet,
+            OP_GOCONT: self.handle_gocont,
+            OP_NAK: self.handle_nak,
+            OP_FAIL: self.handle_fail,
+        }
         self.connect_to_radio()
         self.start_watchdog()
+        self.start_sender()
 
     @work(exclusive=True, thread=True)
     def connect_to_radio(self) -> None:
         try:
             self.log_message("Scanning for radio...")
             self.interface = meshtastic.serial_interface.SerialInterface()
+            self.enable_low_latency()
             pub.subscribe(self.on_packet_received, "meshtastic.receive")
             time.sleep(2)
             self.call_from_thread(self.refresh_nodes)
@@ -100,161 +174,383 @@ class MeshZApp(App):
         except Exception as e:
             self.log_message(f"Connection Failed: {str(e)}")
 
+    def enable_low_latency(self) -> None:
+        # USB-serial adapters buffer reads for ~16 ms by default, delaying every GOCONT round-trip
+        try:
+            self.interface.stream.set_low_latency_mode(True)
+            self.log_message("⚡ Serial low-latency mode enabled.")
+        except (AttributeError, OSError, ValueError) as e:
+            self.log_message(f"Serial low-latency mode unavailable: {e}")
+
     def start_watchdog(self):
         def watch_loop():
             while True:
-                time.sleep(1)
-                if self.transfer_active and self.current_chunk > 0:
-                    if (time.time() - self.last_ack_time) > self.TIMEOUT_SECONDS:
-                        self.handle_timeout()
+                with self._timer_cv:
+                    while True:
+                        now = time.monotonic()
+                        if not self._timer_heap:
+                            self._timer_cv.wait()
+                        elif self._timer_heap[0][0] > now:
+                            self._timer_cv.wait(self._timer_heap[0][0] - now)
+                        else:
+                            break
+                    _, chunk_num = heapq.heappop(self._timer_heap)
+                    sent_at = self.in_flight.get(chunk_num)
+                # Skip timers for chunks since acknowledged or resent
+                if self.transfer_active and sent_at is not None and now - sent_at >= self.TIMEOUT_SECONDS:
+                    self.handle_timeout(chunk_num)
         t = threading.Thread(target=watch_loop, daemon=True)
         t.start()
 
-    def handle_timeout(self):
-        if self.retry_count < self.MAX_RETRIES:
-            self.retry_count += 1
-            self.log_message(f"⚠️ Timeout! Retrying Chunk {self.current_chunk} ({self.retry_count}/{self.MAX_RETRIES})")
-            self.send_next_chunk()
+    def start_sender(self):
+        def send_loop():
+            while True:
+                chunk_num = self._send_queue.get()
+                if self.transfer_active:
+                    self.send_chunk(chunk_num)
+        t = threading.Thread(target=send_loop, daemon=True)
+        t.start()
+
+    def handle_timeout(self, chunk_num):
+        # Check and re-arm in one step so a GOCONT landing in between can't resurrect an acked chunk
+        with self._timer_cv:
+            if chunk_num not in self.in_flight: return
+            retries = self.retry_count.get(chunk_num, 0)
+            if retries < self.MAX_RETRIES:
+                self.retry_count[chunk_num] = retries + 1
+                self.arm_timer(chunk_num)
+                self._send_queue.put(chunk_num)
+            else:
+                self.transfer_active = False
+                self.in_flight = {}
+        if retries < self.MAX_RETRIES:
+            self.log_message(f"⚠️ Timeout! Retrying Chunk {chunk_num} ({retries + 1}/{self.MAX_RETRIES})")
         else:
-            self.log_message("❌ Transfer Failed: Max retries exceeded.")
-            self.transfer_active = False
+            self.log_message(f"❌ Transfer Failed: Max retries exceeded on chunk {chunk_num}.")
+            self.release_file_data()
             self.call_from_thread(self.hide_progress)
 
     def hide_progress(self):
-        self.query_one("#progress-container").display = "none"
+        self._pending_progress = None
+        self._progress_container.display = "none"
+
+    # On-air bytes/sec from acknowledged chunks (compressed bytes when the file was compressed)
+    def transfer_rate(self) -> float:
+        elapsed = time.time() - self.transfer_start_time
+        if elapsed <= 0: return 0.0
+        with self._timer_cv:
+            acked = (self.next_to_send - 1) - len(self.in_flight)
+        return (acked * self.CHUNK_SIZE) / elapsed
 
-    def update_progress(self, current, total, label_text="Transferring..."):
-        bar = self.query_one("#transfer-bar", ProgressBar)
-        txt = self.query_one("#progress-text", Label)
-        container = self.query_one("#progress-container")
-        container.display = "block"
-        bar.total = total
-        bar.progress = current
-        txt.update(f"📊 {label_text}: {current}/{total} chunks")
+    def update_progress(self, current, total, label_text="Transferring...", rate=None):
+        # Safe from any thread; only the latest value is drawn on the next flush
+        self._pending_progress = (current, total, label_text, rate)
+
+    def _flush_progress(self) -> None:
+        pending, self._pending_progress = self._pending_progress, None
+        if pending is None: return
+        current, total, label_text, rate = pending
+        self._progress_container.display = "block"
+        self._bar.total = total
+        self._bar.progress = current
+        rate_text = f" @ {rate:.0f} B/s" if rate is not None else ""
+        self._progress_txt.update(f"📊 {label_text}: {current}/{total} chunks{rate_text}")
 
     def on_packet_received(self, packet, interface):
+        # Called for every packet the radio hears; drop anything not ours before doing real work
+        decoded = packet.get('decoded')
+        if not decoded: return
+        handler = self._port_handlers.get(decoded.get('portnum'))
+        if handler is None: return
         try:
-            if 'decoded' in packet and packet['decoded']['portnum'] == 'TEXT_MESSAGE_APP':
-                sender = packet.get('fromId')
-                msg = packet['decoded']['payload']
-                if isinstance(msg, bytes): msg = msg.decode('utf-8')
-                
-                if msg.startswith("MESHZ_REQ"):
-                    parts = msg.split("|")
-                    self.receiving_file_name = parts[1]
-                    self.receiving_total_chunks = int(parts[3])
-                    self.receive_buffer = {} 
-                    self.log_message(f"📩 REQ from {sender}: {self.receiving_file_name}")
-                    self.update_progress(0, self.receiving_total_chunks, "Receiving")
-                    self.interface.sendText("MESHZ_ACK", destinationId=sender)
-                
-                elif msg.startswith("ZD|"):
-                    parts = msg.split("|")
-                    c_num = int(parts[1])
-                    c_data = parts[2]
-                    self.receive_buffer[c_num] = base64.b64decode(c_data)
-                    self.update_progress(len(self.receive_buffer), self.receiving_total_chunks, "Receiving")
-                    self.interface.sendText(f"MESHZ_GOCONT|{c_num}", destinationId=sender)
-                    if len(self.receive_buffer) == self.receiving_total_chunks:
-                        self.save_received_file()
-                        self.call_from_thread(self.hide_progress)
-
-                elif msg == "MESHZ_ACK":
-                    if self.transfer_active and sender == self.target_node_id:
-                        self.current_chunk = 1
-                        self.last_ack_time = time.time()
-                        self.retry_count = 0
-                        self.update_progress(1, self.total_chunks, "Sending")
-                        self.send_next_chunk()
-
-                elif msg.startswith("MESHZ_GOCONT|"):
-                    if self.transfer_active and sender == self.target_node_id:
-                        ack_num = int(msg.split("|")[1])
-                        if ack_num == self.current_chunk:
-                            self.last_ack_time = time.time()
-                            self.retry_count = 0 
-                            self.current_chunk += 1
-                            if self.current_chunk <= self.total_chunks:
-                                self.update_progress(self.current_chunk, self.total_chunks, "Sending")
-                                self.send_next_chunk()
-                            else:
-                                self.transfer_active = False
-                                self.log_message("🏁 TRANSFER COMPLETE!")
-                                self.call_from_thread(self.hide_progress)
+            handler(packet.get('fromId'), decoded['payload'])
         except Exception as e:
             self.log_message(f"Packet Error: {e}")
 
-    def save_received_file(self) -> None:
+    def handle_binary_packet(self, sender, payload):
+        if len(payload) < _PACKET_HEADER.size: return
+        op, num = _PACKET_HEADER.unpack_from(payload)
+        handler = self._op_handlers.get(op)
+        if handler is not None:
+            handler(sender, num, payload)
+
+    def handle_data_packet(self, sender, c_num, payload):
+        if sender != self.receiving_peer or len(payload) < _PACKET_HEADER.size + _CRC_TRAILER.size: return
+        # The CRC covers the header too, so a flipped chunk number can't land data in the wrong slot
+        body = memoryview(payload)[:-_CRC_TRAILER.size]
+        in_range = 1 <= c_num <= self.receiving_total_chunks
+        if zlib.crc32(body) != _CRC_TRAILER.unpack_from(payload, len(body))[0]:
+            if in_range:
+                self.log_message(f"⚠️ Chunk {c_num} failed CRC check, requesting resend")
+                self.send_reply(sender, OP_NAK, c_num)
+            return
+        if not in_range: return
+        if self.received_mask[c_num - 1]:
+            # Retransmit after our GOCONT was lost: re-acknowledge, nothing to store
+            self.send_reply(sender, OP_GOCONT, c_num)
+            return
+        data = body[_PACKET_HEADER.size:]
+        off = (c_num - 1) * self.CHUNK_SIZE
+        if len(data) != min(self.CHUNK_SIZE, len(self.receive_buffer) - off):
+            self.log_message(f"⚠️ Chunk {c_num} has the wrong length, dropped")
+            return
+        self._receive_view[off:off + len(data)] = data
+        self.received_mask[c_num - 1] = 1
+        self.received_count += 1
+        self.update_progress(self.received_count, self.receiving_total_chunks, "Receiving")
+        if self.received_count == self.receiving_total_chunks and not self.finish_receive():
+            # Withhold the final GOCONT so the sender can't report success for a discarded file,
+            # and stop answering retransmits in case the FAIL itself is lost
+            self.receiving_peer = None
+            self.send_reply(sender, OP_FAIL, c_num)
+            return
+        self.send_reply(sender, OP_GOCONT, c_num)
+
+    def finish_receive(self) -> bool:
+        saved = False
+        try:
+            data = self._receive_view
+            if self.receiving_compressed:
+                # Trust the frame's claimed size only once it matches what the REQ announced
+                if zstandard.frame_content_size(data) != self.receiving_file_size:
+                    self.log_message(f"❌ {self.receiving_file_name} size doesn't match its REQ, not saved.")
+                    self.call_from_thread(self.hide_progress)
+                    return False
+                data = zstandard.ZstdDecompressor().decompress(data)
+            if len(data) == self.receiving_file_size and zlib.crc32(data) == self.receiving_file_crc:
+                saved = self.save_received_file(data)
+            else:
+                self.log_message(f"❌ {self.receiving_file_name} failed file CRC check, not saved.")
+        except zstandard.ZstdError as e:
+            self.log_message(f"❌ Decompression Error: {e}")
+        self.call_from_thread(self.hide_progress)
+        return saved
+
+    def send_reply(self, sender, op, c_num):
+        with self._radio_lock:
+            self.interface.sendData(_PACKET_HEADER.pack(op, c_num), destinationId=sender,
+                                    portNum=Z_MESH_PORTNUM, wantAck=False)
+
+    def handle_gocont(self, sender, ack_num, payload):
+        if not self.transfer_active or sender != self.target_node_id: return
+        with self._timer_cv:
+            if self.in_flight.pop(ack_num, None) is None: return
+            self.retry_count.pop(ack_num, None)
+            self.base = min(self.in_flight) if self.in_flight else self.next_to_send
+            acked = (self.next_to_send - 1) - len(self.in_flight)
+        if acked < self.total_chunks:
+            self.update_progress(acked, self.total_chunks, "Sending", self.transfer_rate())
+            self.fill_window()
+        else:
+            self.transfer_active = False
+            self.release_file_data()
+            self.log_message("🏁 TRANSFER COMPLETE!")
+            self.call_from_thread(self.hide_progress)
+
+    def handle_nak(self, sender, c_num, payload):
+        if self.transfer_active and sender == self.target_node_id:
+            self.handle_timeout(c_num)
+
+    def handle_fail(self, sender, c_num, payload):
+        if not self.transfer_active or sender != self.target_node_id: return
+        with self._timer_cv:
+            self.transfer_active = False
+            self.in_flight = {}
+        self.log_message("❌ Transfer Failed: receiver could not verify the file.")
+        self.release_file_data()
+        self.call_from_thread(self.hide_progress)
+
+    def handle_control_message(self, sender, msg):
+        if isinstance(msg, bytes): msg = msg.decode('utf-8')
+        if not msg.startswith("MESHZ_"): return  # Ordinary chat traffic
+
+        head, _, rest = msg.partition("|")
+        if head == "MESHZ_REQ":
+            filename, _, rest = rest.partition("|")
+            filesize, _, rest = rest.partition("|")
+            total, _, rest = rest.partition("|")
+            file_crc, _, rest = rest.partition("|")
+            wire_size, _, compressed = rest.partition("|")
+            # Any node can send a REQ: parse and bound every field before touching receiver state
+            try:
+                filesize, total, wire_size = int(filesize), int(total), int(wire_size)
+                file_crc = int(file_crc, 16)
+            except ValueError:
+                filesize = total = wire_size = file_crc = -1
+            cs = self.CHUNK_SIZE
+            # Exactly `total` chunks' worth of bytes with a non-empty last chunk (or one empty chunk)
+            sizes_ok = (0 < total <= self.MAX_CHUNKS and 0 <= filesize <= self.MAX_FILE_SIZE
+                        and ((total - 1) * cs < wire_size <= total * cs or (total, wire_size) == (1, 0)))
+            fields_ok = 0 <= file_crc <= 0xFFFFFFFF and compressed in ("0", "1")
+            if not (sizes_ok and fields_ok) or (compressed == "0" and wire_size != filesize):
+                self.log_message(f"❌ Ignoring malformed REQ from {sender}")
+                return
+            self.receiving_peer = sender
+            self.receiving_file_name = filename
+            self.receiving_total_chunks = total
+            self.receiving_file_size = filesize
+            self.receiving_file_crc = file_crc
+            self.receiving_compressed = compressed == "1"
+            # Sized to what goes over the air; compressed transfers are inflated on completion
+            self.receive_buffer = bytearray(wire_size)
+            self._receive_view = memoryview(self.receive_buffer)
+            self.received_mask = bytearray(self.receiving_total_chunks)
+            self.received_count = 0
+            self.log_message(f"📩 REQ from {sender}: {self.receiving_file_name} ({filesize} bytes)")
+            self.update_progress(0, self.receiving_total_chunks, "Receiving")
+            with self._radio_lock:
+                self.interface.sendText("MESHZ_ACK", destinationId=sender)
+
+        elif head == "MESHZ_ACK":
+            if self.transfer_active and sender == self.target_node_id and self.next_to_send == 0:
+                self.next_to_send = 1
+                self.base = 1
+                self.transfer_start_time = time.time()
+                self.update_progress(0, self.total_chunks, "Sending")
+                self.fill_window()
+
+    def save_received_file(self, data) -> bool:
         try:
             downloads_path = str(Path.home() / "Downloads")
             save_path = os.path.join(downloads_path, f"meshz_{self.receiving_file_name}")
             with open(save_path, "wb") as f:
-                for i in range(1, self.receiving_total_chunks + 1):
-                    f.write(self.receive_buffer[i])
+                f.write(data)
             self.log_message(f"💾 FILE SAVED: {save_path}")
+            return True
         except Exception as e:
             self.log_message(f"❌ Save Error: {e}")
+            return False
 
     def handle_send_request(self) -> None:
         if not self.target_node_id or not self.selected_file_path:
             self.log_message("❌ Target or File missing!")
             return
+        # Cheap size check on the UI thread; reading and compressing happen in prepare_transfer
         try:
-            filename = os.path.basename(self.selected_file_path)
             filesize = os.path.getsize(self.selected_file_path)
-            self.total_chunks = (filesize // self.CHUNK_SIZE) + 1
-            self.current_chunk = 0
+        except OSError as e:
+            self.log_message(f"❌ Error: {str(e)}")
+            return
+        if filesize > self.MAX_FILE_SIZE:
+            self.log_message(f"❌ File too large: {filesize} bytes can't fit in {self.MAX_CHUNKS} chunks even compressed.")
+            return
+        self.prepare_transfer(str(self.selected_file_path))
+
+    @work(exclusive=True, thread=True, group="send")
+    def prepare_transfer(self, path: str) -> None:
+        try:
+            filename = os.path.basename(path)
+            data = Path(path).read_bytes()
+            filesize = len(data)
+            file_crc = zlib.crc32(data)
+            compressed = zstandard.ZstdCompressor(level=self.ZSTD_LEVEL).compress(data)
+            use_comp = len(compressed) < filesize * self.MIN_COMPRESSION_GAIN
+            if use_comp:
+                self.log_message(f"🗜️ Compressed {filesize} → {len(compressed)} bytes")
+                data = compressed
+            # Ceiling division; an empty file still needs one (empty) chunk to complete the handshake
+            total_chunks = max(1, (len(data) + self.CHUNK_SIZE - 1) // self.CHUNK_SIZE)
+            if total_chunks > self.MAX_CHUNKS:
+                self.log_message(f"❌ File too large: {total_chunks} chunks exceeds the {self.MAX_CHUNKS} chunk limit.")
+                return
+            # Every packet is built here once, so sends and retries are a plain list index
+            view = memoryview(data)
+            cs = self.CHUNK_SIZE
+            payloads = []
+            for i in range(total_chunks):
+                header = _PACKET_HEADER.pack(OP_DATA, i + 1)
+                chunk = view[i * cs:(i + 1) * cs]
+                crc = zlib.crc32(chunk, zlib.crc32(header))
+                payloads.append(b"".join((header, chunk, _CRC_TRAILER.pack(crc))))
+            # Only touch transfer state once the new file is known to be sendable
+            self.total_chunks = total_chunks
+            self.next_to_send = 0
+            self.base = 0
+            with self._timer_cv:
+                self._payloads = payloads
+                self.in_flight = {}
+                self.retry_count = {}
             self.transfer_active = True
-            self.last_ack_time = time.time()
             self.update_progress(0, self.total_chunks, "Initiating")
-            self.interface.sendText(f"MESHZ_REQ|{filename}|{filesize}|{self.total_chunks}", destinationId=self.target_node_id)
+            with self._radio_lock:
+                self.interface.sendText(f"MESHZ_REQ|{filename}|{filesize}|{self.total_chunks}|{file_crc:08x}|{len(data)}|{int(use_comp)}", destinationId=self.target_node_id)
             self.log_message(f"📡 Sending: {filename}...")
         except Exception as e:
             self.log_message(f"❌ Error: {str(e)}")
 
-    def send_next_chunk(self) -> None:
+    def fill_window(self) -> None:
+        while (self.transfer_active and self.next_to_send <= self.total_chunks
+               and self.next_to_send < self.base + self.WINDOW_SIZE):
+            chunk_num = self.next_to_send
+            self.next_to_send += 1
+            self.queue_chunk(chunk_num)
+
+    def queue_chunk(self, chunk_num) -> None:
+        # Mark in flight now so the window and watchdog account for it before it hits the radio
+        self.arm_timer(chunk_num)
+        self._send_queue.put(chunk_num)
+
+    def arm_timer(self, chunk_num) -> None:
+        # Monotonic, so a wall-clock step (e.g. NTP on an RTC-less Pi) can't stall or mass-fire retransmits
+        sent_at = time.monotonic()
+        with self._timer_cv:
+            self.in_flight[chunk_num] = sent_at
+            heapq.heappush(self._timer_heap, (sent_at + self.TIMEOUT_SECONDS, chunk_num))
+            self._timer_cv.notify()
+
+    def send_chunk(self, chunk_num) -> None:
         try:
-            with open(self.selected_file_path, "rb") as f:
-                f.seek((self.current_chunk - 1) * self.CHUNK_SIZE)
-                raw_data = f.read(self.CHUNK_SIZE)
-                encoded_data = base64.b64encode(raw_data).decode('utf-8')
-                self.interface.sendText(f"ZD|{self.current_chunk}|{encoded_data}", destinationId=self.target_node_id)
+            with self._timer_cv:
+                if chunk_num not in self.in_flight: return  # Acknowledged while queued
+                self.arm_timer(chunk_num)
+                payload = self._payloads[chunk_num - 1]
+            with self._radio_lock:
+                self.interface.sendData(payload, destinationId=self.target_node_id,
+                                        portNum=Z_MESH_PORTNUM, wantAck=False)
         except Exception as e:
             self.log_message(f"❌ Chunk Error: {e}")
             self.transfer_active = False
+            self.release_file_data()
+
+    def release_file_data(self) -> None:
+        self._payloads = None
 
     def log_message(self, message: str) -> None:
-        try:
-            log_widget = self.query_one("#status-log")
-            if self._thread_id == threading.get_ident():
-                log_widget.write_line(message)
-            else:
-                self.call_from_thread(log_widget.write_line, message)
-        except: pass
+        self._log_queue.append(message)
+
+    def _drain_log(self) -> None:
+        lines = []
+        while self._log_queue:
+            lines.append(self._log_queue.popleft())
+        if lines:
+            self._status_log.write_lines(lines)
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "btn-select":
-            self.query_one("#file-browser-container").display = not self.query_one("#file-browser-container").display
+            if not self._file_browser_loaded:
+                # Built on first use so scanning the home directory doesn't stall startup
+                self._file_browser_container.mount(NoHiddenFilter(str(Path.home()), id="file-browser"))
+                self._file_browser_loaded = True
+            self._file_browser_container.display = not self._file_browser_container.display
         elif event.button.id == "btn-send":
             self.handle_send_request()
 
     def refresh_nodes(self) -> None:
         if not hasattr(self, 'interface') or not self.interface.nodes: return
-        table = self.query_one("#node-table", DataTable)
-        table.clear(columns=False) 
+        self._node_table.clear(columns=False) 
         for node_id, node in self.interface.nodes.items():
             user = node.get('user', {})
-            table.add_row(user.get('longName', node_id), node_id, str(node.get('snr', 'N/A')))
+            self._node_table.add_row(user.get('longName', node_id), node_id, str(node.get('snr', 'N/A')))
 
     def on_directory_tree_file_selected(self, event: DirectoryTree.FileSelected) -> None:
         self.selected_file_path = event.path
-        self.query_one("#file-label").update(f"📂 FILE: {os.path.basename(event.path)}")
-        self.query_one("#file-browser-container").display = False
+        self._file_label.update(f"📂 FILE: {os.path.basename(event.path)}")
+        self._file_browser_container.display = False
 
     def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
         row_data = event.data_table.get_row(event.row_key)
         self.target_node_id = str(row_data[1])
-        self.query_one("#target-label").update(f"🎯 TARGET: {row_data[0]} ({self.target_node_id})")
+        self._target_label.update(f"🎯 TARGET: {row_data[0]} ({self.target_node_id})")
 
 if __name__ == "__main__":
     MeshZApp().run()
\ No newline at end of file